@@ -1,40 +1,131 @@
 from __future__ import annotations
 
 import asyncio
+import re
 import socket
 import ssl
-import subprocess
 import sys
-import urllib.request
-from dataclasses import dataclass
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, Tuple
 
+import aiohttp
+import msgspec
+
+try:
+    from cryptography import x509
+except ImportError:
+    x509 = None
+
 from .utils import Timed, now_ms
 
 
-@dataclass
-class DNSResult:
+class DNSResult(msgspec.Struct):
     ok: bool
     hostname: str
     ips: list[str]
     error: str | None
     ms: float
+    stale: bool = False
 
 
-async def dns_lookup(hostname: str, timeout_s: float = 2.5) -> DNSResult:
-    start = now_ms()
+DNS_CACHE_TTL_S = 60.0
+DNS_STALE_DEADLINE_S = 0.5
+DNS_MAX_STALE_S = 86400.0
+
+_DNSKey = Tuple[str, int, int]
+_dns_cache: Dict[_DNSKey, Tuple[float, list[tuple]]] = {}
+_inflight: Dict[_DNSKey, "asyncio.Future[list[tuple]]"] = {}
+
+
+async def _resolve(key: _DNSKey, ttl: float) -> list[tuple]:
+    host, family, proto = key
     try:
         loop = asyncio.get_running_loop()
-        infos = await asyncio.wait_for(loop.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP), timeout=timeout_s)
+        infos = await loop.getaddrinfo(host, None, family=family, proto=proto)
+        if ttl > 0:
+            _dns_cache[key] = (time.monotonic() + ttl, infos)
+        return infos
+    finally:
+        _inflight.pop(key, None)
+
+
+def _consume(fut: "asyncio.Future[Any]") -> None:
+    if not fut.cancelled():
+        fut.exception()
+
+
+async def _cached_getaddrinfo(host: str, family: int = 0, proto: int = socket.IPPROTO_TCP, ttl: float = DNS_CACHE_TTL_S) -> list[tuple]:
+    key = (host, family, proto)
+    entry = _dns_cache.get(key)
+    if entry is not None and time.monotonic() < entry[0]:
+        return entry[1]
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(_resolve(key, ttl))
+        fut.add_done_callback(_consume)
+        _inflight[key] = fut
+    return await asyncio.shield(fut)
+
+
+async def _getaddrinfo_or_stale(host: str, ttl: float, stale_deadline_s: float) -> Tuple[list[tuple], bool]:
+    key = (host, 0, socket.IPPROTO_TCP)
+    entry = _dns_cache.get(key)
+    if entry is not None and time.monotonic() >= entry[0] + DNS_MAX_STALE_S:
+        _dns_cache.pop(key, None)
+        entry = None
+    if entry is None:
+        return await _cached_getaddrinfo(host, ttl=ttl), False
+    try:
+        return await asyncio.wait_for(_cached_getaddrinfo(host, ttl=ttl), timeout=stale_deadline_s), False
+    except asyncio.TimeoutError:
+        return entry[1], True
+    except socket.gaierror as e:
+        if e.errno != socket.EAI_AGAIN:
+            raise
+        return entry[1], True
+
+
+def _numeric_addrinfo(host: str) -> Optional[list[tuple]]:
+    try:
+        return socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP, flags=socket.AI_NUMERICHOST)
+    except socket.gaierror:
+        return None
+
+
+async def resolve_addrs(host: str, cache_ttl: float = DNS_CACHE_TTL_S, stale_deadline_s: float = DNS_STALE_DEADLINE_S) -> list[tuple]:
+    infos = _numeric_addrinfo(host)
+    if infos is not None:
+        return infos
+    infos, _ = await _getaddrinfo_or_stale(host, cache_ttl, stale_deadline_s)
+    return infos
+
+
+def _connect_any(addrs: list[tuple], port: int, timeout_s: float) -> socket.socket:
+    err: OSError | None = None
+    for family, _, proto, _, sockaddr in addrs:
+        sock = socket.socket(family, socket.SOCK_STREAM, proto)
+        try:
+            sock.settimeout(timeout_s)
+            sock.connect((sockaddr[0], port, *sockaddr[2:]))
+            return sock
+        except OSError as e:
+            sock.close()
+            err = e
+    raise err or OSError("getaddrinfo returned no addresses")
+
+
+async def dns_lookup(hostname: str, timeout_s: float = 2.5, cache_ttl: float = DNS_CACHE_TTL_S, stale_deadline_s: float = DNS_STALE_DEADLINE_S) -> DNSResult:
+    start = now_ms()
+    try:
+        infos, stale = await asyncio.wait_for(_getaddrinfo_or_stale(hostname, cache_ttl, stale_deadline_s), timeout=timeout_s)
         ips = sorted({info[4][0] for info in infos})
-        return DNSResult(ok=True, hostname=hostname, ips=ips, error=None, ms=now_ms() - start)
+        return DNSResult(ok=True, hostname=hostname, ips=ips, error=None, ms=now_ms() - start, stale=stale)
     except Exception as e:
         return DNSResult(ok=False, hostname=hostname, ips=[], error=str(e), ms=now_ms() - start)
 
 
-@dataclass
-class TCPResult:
+class TCPResult(msgspec.Struct):
     ok: bool
     host: str
     port: int
@@ -44,21 +135,28 @@ class TCPResult:
 
 async def tcp_connect(host: str, port: int, timeout_s: float = 2.5) -> TCPResult:
     start = now_ms()
+
+    async def _connect() -> None:
+        loop = asyncio.get_running_loop()
+        err: OSError | None = None
+        for family, _, proto, _, sockaddr in await resolve_addrs(host):
+            with socket.socket(family, socket.SOCK_STREAM, proto) as sock:
+                sock.setblocking(False)
+                try:
+                    await loop.sock_connect(sock, (sockaddr[0], port, *sockaddr[2:]))
+                    return
+                except OSError as e:
+                    err = e
+        raise err or OSError("getaddrinfo returned no addresses")
+
     try:
-        fut = asyncio.open_connection(host, port)
-        reader, writer = await asyncio.wait_for(fut, timeout=timeout_s)
-        writer.close()
-        try:
-            await writer.wait_closed()
-        except Exception:
-            pass
+        await asyncio.wait_for(_connect(), timeout=timeout_s)
         return TCPResult(ok=True, host=host, port=port, ms=now_ms() - start, error=None)
     except Exception as e:
         return TCPResult(ok=False, host=host, port=port, ms=now_ms() - start, error=str(e))
 
 
-@dataclass
-class HTTPResult:
+class HTTPResult(msgspec.Struct):
     ok: bool
     url: str
     status: int | None
@@ -66,24 +164,21 @@ class HTTPResult:
     error: str | None
 
 
-async def http_check(url: str, timeout_s: float = 4.0, method: str = "GET") -> HTTPResult:
+async def http_check(session: aiohttp.ClientSession, url: str, timeout_s: float = 4.0, method: str = "GET") -> HTTPResult:
     start = now_ms()
-
-    def _req() -> Tuple[int, int]:
-        req = urllib.request.Request(url=url, method=method, headers={"User-Agent": "netcheck/1.0"})
-        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-            return int(resp.status), int(resp.getheader("Content-Length") or 0)
-
     try:
-        loop = asyncio.get_running_loop()
-        status, _ = await asyncio.wait_for(loop.run_in_executor(None, _req), timeout=timeout_s + 0.5)
-        return HTTPResult(ok=True, url=url, status=status, ms=now_ms() - start, error=None)
+        timeout = aiohttp.ClientTimeout(total=timeout_s)
+        async with session.request(method, url, timeout=timeout, headers={"User-Agent": "netcheck/1.0"}) as resp:
+            status = resp.status
+            reason = resp.reason
+            await resp.read()
+        ok = status < 400
+        return HTTPResult(ok=ok, url=url, status=status, ms=now_ms() - start, error=None if ok else f"HTTP Error {status}: {reason}")
     except Exception as e:
-        return HTTPResult(ok=False, url=url, status=None, ms=now_ms() - start, error=str(e))
+        return HTTPResult(ok=False, url=url, status=None, ms=now_ms() - start, error=str(e) or type(e).__name__)
 
 
-@dataclass
-class TLSResult:
+class TLSResult(msgspec.Struct):
     ok: bool
     host: str
     port: int
@@ -93,30 +188,92 @@ class TLSResult:
     error: str | None
 
 
-async def tls_expiry(host: str, port: int = 443, timeout_s: float = 3.5) -> TLSResult:
+def _der_tlv(der: bytes, pos: int) -> Tuple[int, int, int]:
+    tag = der[pos]
+    length = der[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(der[pos:pos + n], "big")
+        pos += n
+    return tag, pos, pos + length
+
+
+def _der_time(tag: int, raw: bytes) -> datetime:
+    if tag == 0x17:
+        yy = int(raw[0:2])
+        year = yy + (1900 if yy >= 50 else 2000)
+        raw = raw[2:]
+    else:
+        year = int(raw[0:4])
+        raw = raw[4:]
+    return datetime(year, int(raw[0:2]), int(raw[2:4]), int(raw[4:6]), int(raw[6:8]), int(raw[8:10]), tzinfo=timezone.utc)
+
+
+def _not_after_from_der(der: bytes) -> datetime:
+    if x509 is not None:
+        return x509.load_der_x509_certificate(der).not_valid_after_utc
+    _, pos, _ = _der_tlv(der, 0)
+    _, pos, _ = _der_tlv(der, pos)
+    if der[pos] == 0xA0:
+        _, _, pos = _der_tlv(der, pos)
+    for _ in range(3):
+        _, _, pos = _der_tlv(der, pos)
+    _, pos, _ = _der_tlv(der, pos)
+    _, _, pos = _der_tlv(der, pos)
+    tag, start, end = _der_tlv(der, pos)
+    return _der_time(tag, der[start:end])
+
+
+_ssl_ctx: Optional[ssl.SSLContext] = None
+
+
+def default_ssl_context() -> ssl.SSLContext:
+    global _ssl_ctx
+    if _ssl_ctx is None:
+        _ssl_ctx = ssl.create_default_context()
+    return _ssl_ctx
+
+
+_tls_cache: Dict[Tuple[str, int], Tuple[datetime, float]] = {}
+
+
+def _tls_cache_ttl(days_left: int) -> float:
+    return max(3600.0, days_left * 86400 / 10)
+
+
+async def tls_expiry(host: str, port: int = 443, timeout_s: float = 3.5, now_utc: datetime | None = None, force_refresh: bool = False) -> TLSResult:
     start = now_ms()
+    now_utc = now_utc or datetime.now(timezone.utc)
 
-    def _fetch_cert() -> Dict[str, Any]:
-        ctx = ssl.create_default_context()
-        with socket.create_connection((host, port), timeout=timeout_s) as sock:
+    cached = None if force_refresh else _tls_cache.get((host, port))
+    if cached is not None:
+        not_after, fetched_at = cached
+        days = (not_after - now_utc).days
+        if time.monotonic() - fetched_at < _tls_cache_ttl(days):
+            return TLSResult(ok=True, host=host, port=port, not_after=not_after.isoformat(), days_left=days, ms=now_ms() - start, error=None)
+
+    def _fetch_cert(addrs: list[tuple], ctx: ssl.SSLContext) -> Optional[bytes]:
+        with _connect_any(addrs, port, timeout_s) as sock:
             with ctx.wrap_socket(sock, server_hostname=host) as ssock:
-                return ssock.getpeercert()
+                return ssock.getpeercert(binary_form=True)
+
+    async def _fetch() -> Optional[bytes]:
+        addrs = await resolve_addrs(host)
+        return await asyncio.get_running_loop().run_in_executor(None, _fetch_cert, addrs, default_ssl_context())
 
     try:
-        loop = asyncio.get_running_loop()
-        cert = await asyncio.wait_for(loop.run_in_executor(None, _fetch_cert), timeout=timeout_s + 0.5)
-        not_after_raw = cert.get("notAfter")
-        if not not_after_raw:
-            return TLSResult(ok=False, host=host, port=port, not_after=None, days_left=None, ms=now_ms() - start, error="no notAfter")
-        dt = datetime.strptime(not_after_raw, "%b %d %H:%M:%S %Y %Z").replace(tzinfo=timezone.utc)
-        days = (dt - datetime.now(timezone.utc)).days
-        return TLSResult(ok=True, host=host, port=port, not_after=dt.isoformat(), days_left=days, ms=now_ms() - start, error=None)
+        der = await asyncio.wait_for(_fetch(), timeout=timeout_s + 0.5)
+        if not der:
+            return TLSResult(ok=False, host=host, port=port, not_after=None, days_left=None, ms=now_ms() - start, error="no peer certificate")
+        dt = _not_after_from_der(der)
+        _tls_cache[(host, port)] = (dt, time.monotonic())
+        return TLSResult(ok=True, host=host, port=port, not_after=dt.isoformat(), days_left=(dt - now_utc).days, ms=now_ms() - start, error=None)
     except Exception as e:
         return TLSResult(ok=False, host=host, port=port, not_after=None, days_left=None, ms=now_ms() - start, error=str(e))
 
 
-@dataclass
-class PingResult:
+class PingResult(msgspec.Struct):
     ok: bool
     host: str
     transmitted: int
@@ -133,51 +290,33 @@ def _ping_cmd(host: str, count: int, timeout_s: int) -> list[str]:
     return ["ping", "-c", str(count), "-W", str(timeout_s), host]
 
 
+_PING_POSIX_RE = re.compile(r"(\d+) packets transmitted, (\d+) (?:packets )?received(?:.*?min/avg/max[^=]*=\s*[\d.]+/([\d.]+)/)?", re.S)
+_PING_WIN_RE = re.compile(r"Sent = (\d+), Received = (\d+)(?:.*?Average = (\d+)ms)?", re.S)
+
+
+def _parse_ping(out: str, count: int) -> Tuple[int, int, Optional[float]]:
+    m = (_PING_WIN_RE if sys.platform.startswith("win") else _PING_POSIX_RE).search(out)
+    if m is None:
+        return count, 0, None
+    transmitted, received, avg = m.groups()
+    return int(transmitted), int(received), float(avg) if avg else None
+
+
 async def ping(host: str, count: int = 3, timeout_s: int = 2) -> PingResult:
     start = now_ms()
     cmd = _ping_cmd(host, count=count, timeout_s=timeout_s)
 
-    def _run() -> Tuple[int, str]:
-        p = subprocess.run(cmd, capture_output=True, text=True)
-        out = (p.stdout or "") + "\n" + (p.stderr or "")
-        return p.returncode, out
-
     try:
-        loop = asyncio.get_running_loop()
-        code, out = await loop.run_in_executor(None, _run)
-
-        transmitted = count
-        received = 0
-        avg = None
-
-        if "Received =" in out and "Lost =" in out:
-            try:
-                part = out.split("Packets:")[1]
-                segs = part.split(",")
-                rec = [s for s in segs if "Received" in s][0]
-                received = int("".join(ch for ch in rec if ch.isdigit()))
-            except Exception:
-                received = 0
-            if "Average" in out:
-                try:
-                    avg_part = out.split("Average =")[1].strip()
-                    num = "".join(ch for ch in avg_part if ch.isdigit())
-                    avg = float(num) if num else None
-                except Exception:
-                    avg = None
-        else:
-            if "packets transmitted" in out and "received" in out:
-                try:
-                    line = [l for l in out.splitlines() if "packets transmitted" in l][0]
-                    received = int(line.split("received")[0].split()[-1])
-                except Exception:
-                    received = 0
-            if "min/avg/max" in out:
-                try:
-                    line = [l for l in out.splitlines() if "min/avg/max" in l][0]
-                    avg = float(line.split("=")[1].split("/")[1].strip())
-                except Exception:
-                    avg = None
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=count * timeout_s + 1)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise TimeoutError("ping timed out") from None
+        code = proc.returncode
+        out = stdout.decode(errors="replace") + "\n" + stderr.decode(errors="replace")
+        transmitted, received, avg = _parse_ping(out, count)
 
         loss_pct = 0.0 if transmitted == 0 else (1.0 - (received / transmitted)) * 100.0
         ok = (code == 0) and received > 0
@@ -2,28 +2,51 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-from typing import Any, Dict, List, Tuple
+import contextlib
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Coroutine, Dict, List, Tuple
 
-from .checks import dns_lookup, http_check, ping, tcp_connect, tls_expiry
+import aiohttp
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from .checks import default_ssl_context, dns_lookup, http_check, ping, tcp_connect, tls_expiry
 from .report import build_report, format_console
 from .utils import clamp, write_json
 
+_LIST_RESULTS = {"tcp", "http"}
+_TCP_RE = re.compile(r"\s*(?:([^\s:,]+)\s*:\s*(\d+)\s*)?(?:,|\Z)")
+_URL_RE = re.compile(r"[^\s,]+")
+
 
 def parse_tcp_list(s: str) -> List[Tuple[str, int]]:
     out: List[Tuple[str, int]] = []
-    for item in (x.strip() for x in s.split(",")):
-        if not item:
-            continue
-        if ":" not in item:
+    pos = 0
+    while pos < len(s):
+        m = _TCP_RE.match(s, pos)
+        if m is None:
+            item = s[pos:].split(",", 1)[0].strip()
             raise ValueError(f"Invalid tcp target: {item} (expected host:port)")
-        host, port_s = item.split(":", 1)
-        port = int(port_s)
-        out.append((host.strip(), port))
+        if m.group(1):
+            out.append((m.group(1), int(m.group(2))))
+        pos = m.end()
     return out
 
 
 def parse_url_list(s: str) -> List[str]:
-    return [x.strip() for x in s.split(",") if x.strip()]
+    return _URL_RE.findall(s)
+
+
+def _positive_int(s: str) -> int:
+    n = int(s)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1 (got {n})")
+    return n
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -35,14 +58,16 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--http", help="Comma list of URLs (ex: https://example.com,https://github.com)")
     p.add_argument("--tls", help="Host for TLS expiry (ex: github.com)")
     p.add_argument("--tls-port", type=int, default=443)
+    p.add_argument("--concurrency", type=_positive_int, default=64, help="Max checks in flight at once (default: 64)")
     p.add_argument("--json-out", help="Write JSON report to a file (ex: report.json)")
     return p
 
 
-async def run_checks(args: argparse.Namespace) -> Dict[str, Any]:
+async def run_checks(args: argparse.Namespace, now_utc: datetime | None = None) -> Dict[str, Any]:
     results: Dict[str, Any] = {}
+    now_utc = now_utc or datetime.now(timezone.utc)
 
-    tasks = []
+    tasks: List[Tuple[str, Awaitable[Any]]] = []
 
     if args.dns:
         tasks.append(("dns", dns_lookup(args.dns)))
@@ -51,31 +76,47 @@ async def run_checks(args: argparse.Namespace) -> Dict[str, Any]:
         c = clamp(args.ping_count, 1, 10)
         tasks.append(("ping", ping(args.ping_host, count=c)))
 
-    tcp_tasks = []
     if args.tcp:
         for host, port in parse_tcp_list(args.tcp):
-            tcp_tasks.append(tcp_connect(host, port))
-    if tcp_tasks:
-        results["tcp"] = await asyncio.gather(*tcp_tasks)
-
-    http_tasks = []
-    if args.http:
-        for url in parse_url_list(args.http):
-            http_tasks.append(http_check(url))
-    if http_tasks:
-        results["http"] = await asyncio.gather(*http_tasks)
+            tasks.append(("tcp", tcp_connect(host, port)))
 
     if args.tls:
-        tasks.append(("tls", tls_expiry(args.tls, port=args.tls_port)))
+        tasks.append(("tls", tls_expiry(args.tls, port=args.tls_port, now_utc=now_utc)))
 
-    if tasks:
-        done = await asyncio.gather(*(coro for _, coro in tasks))
-        for (k, _), v in zip(tasks, done):
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def _guarded(coro: Awaitable[Any]) -> Any:
+        async with sem:
+            return await coro
+
+    async with contextlib.AsyncExitStack() as stack:
+        if args.http:
+            connector = aiohttp.TCPConnector(limit=args.concurrency, limit_per_host=8, ttl_dns_cache=60, use_dns_cache=True, ssl=default_ssl_context())
+            session = await stack.enter_async_context(aiohttp.ClientSession(connector=connector))
+            for url in parse_url_list(args.http):
+                tasks.append(("http", http_check(session, url)))
+
+        done = await asyncio.gather(*(_guarded(coro) for _, coro in tasks))
+
+    for (k, _), v in zip(tasks, done):
+        if k in _LIST_RESULTS:
+            results.setdefault(k, []).append(v)
+        else:
             results[k] = v
 
     return results
 
 
+def _run(coro: Coroutine[Any, Any, Dict[str, Any]]) -> Dict[str, Any]:
+    if uvloop is None:
+        return asyncio.run(coro)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(coro)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(coro)
+
+
 def main() -> int:
     parser = build_parser()
     args = parser.parse_args()
@@ -84,8 +125,9 @@ def main() -> int:
         parser.print_help()
         return 2
 
-    results = asyncio.run(run_checks(args))
-    report = build_report(results)
+    now = datetime.now(timezone.utc)
+    results = _run(run_checks(args, now_utc=now))
+    report = build_report(results, now_utc=now)
     print(format_console(report))
 
     if args.json_out:
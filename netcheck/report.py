@@ -1,28 +1,37 @@
 from __future__ import annotations
 
-from dataclasses import asdict
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
+import msgspec
+
 
 def to_dict(obj: Any) -> Dict[str, Any]:
-    if hasattr(obj, "__dict__"):
-        return asdict(obj)
+    if isinstance(obj, msgspec.Struct):
+        return msgspec.structs.asdict(obj)
     return dict(obj)
 
 
-def build_report(results: Dict[str, Any]) -> Dict[str, Any]:
+def build_report(results: Dict[str, Any], now_utc: datetime | None = None) -> Dict[str, Any]:
     ok = True
-    for v in results.values():
+    out: Dict[str, Any] = {}
+    for k, v in results.items():
         if isinstance(v, list):
-            ok = ok and all(getattr(x, "ok", False) for x in v)
+            rows = []
+            for x in v:
+                if not x.ok:
+                    ok = False
+                rows.append(to_dict(x))
+            out[k] = rows
         else:
-            ok = ok and bool(getattr(v, "ok", False))
+            if not v.ok:
+                ok = False
+            out[k] = to_dict(v)
 
     return {
         "ok": ok,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "results": {k: [to_dict(x) for x in v] if isinstance(v, list) else to_dict(v) for k, v in results.items()},
+        "generated_at": (now_utc or datetime.now(timezone.utc)).isoformat(),
+        "results": out,
     }
 
 
@@ -41,7 +50,8 @@ def format_console(report: Dict[str, Any]) -> str:
     if "dns" in res:
         block("DNS")
         r = res["dns"]
-        lines.append(f"{'OK' if r['ok'] else 'FAIL'}  {r['hostname']}  {', '.join(r['ips']) if r['ips'] else ''}  ({r['ms']:.1f} ms)")
+        stale = "  (stale)" if r.get("stale") else ""
+        lines.append(f"{'OK' if r['ok'] else 'FAIL'}  {r['hostname']}  {', '.join(r['ips']) if r['ips'] else ''}  ({r['ms']:.1f} ms){stale}")
         if r.get("error"):
             lines.append(f"      {r['error']}")
         lines.append("")
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import json
 import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+import msgspec
+
 
 @dataclass(frozen=True)
 class Timed:
@@ -14,7 +15,7 @@ class Timed:
 
 
 def now_ms() -> float:
-    return time.perf_counter() * 1000.0
+    return time.perf_counter_ns() / 1_000_000
 
 
 def read_text(path: str) -> str:
@@ -22,7 +23,7 @@ def read_text(path: str) -> str:
 
 
 def write_json(path: str, data: Any) -> None:
-    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    Path(path).write_bytes(msgspec.json.format(msgspec.json.encode(data), indent=2))
 
 
 def clamp(n: int, lo: int, hi: int) -> int:
@@ -1,8 +1,17 @@
 import asyncio
 import socket
+import ssl
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
 import pytest
+import pytest_asyncio
+from aiohttp import web
 
-from netcheck.checks import dns_lookup, tcp_connect
+from netcheck import checks
+from netcheck.checks import _connect_any, _parse_ping, dns_lookup, http_check, ping, tcp_connect, tls_expiry
 
 
 @pytest.mark.asyncio
@@ -19,3 +28,259 @@ async def test_tcp_connect_localhost_closed_port():
     assert r.host == "127.0.0.1"
     assert r.port == 9
     assert isinstance(r.ok, bool)
+
+
+@pytest.mark.asyncio
+async def test_dns_lookup_shares_inflight_and_cache(monkeypatch):
+    loop = asyncio.get_running_loop()
+    calls = []
+
+    async def fake_getaddrinfo(host, port, **kwargs):
+        calls.append(host)
+        await asyncio.sleep(0.05)
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("192.0.2.1", 0))]
+
+    monkeypatch.setattr(loop, "getaddrinfo", fake_getaddrinfo)
+    monkeypatch.setattr(checks, "_dns_cache", {})
+
+    a, b = await asyncio.gather(dns_lookup("cached.test"), dns_lookup("cached.test"))
+    c = await dns_lookup("cached.test")
+    assert a.ips == b.ips == c.ips == ["192.0.2.1"]
+    assert calls == ["cached.test"]
+
+
+TEST_CERT_PEM = """-----BEGIN CERTIFICATE-----
+MIIBcTCCARigAwIBAgIBATAKBggqhkjOPQQDAjAYMRYwFAYDVQQDDA1uZXRjaGVj
+ay50ZXN0MB4XDTI2MTAxNTA5MzQzOVoXDTM2MTAxMjA5MzQzOVowGDEWMBQGA1UE
+AwwNbmV0Y2hlY2sudGVzdDBZMBMGByqGSM49AgEGCCqGSM49AwEHA0IABJ39SIpQ
+xTB0TOCa9BETIAxWXtutGwZhLbOGMDVZ8CnrtMtIGpPxF0gvovlOfRNdgv2U7pPf
+8nsAFM2BzV/msy6jUzBRMB0GA1UdDgQWBBToH08qc42mONUOErhcSGfIdhDDDDAf
+BgNVHSMEGDAWgBToH08qc42mONUOErhcSGfIdhDDDDAPBgNVHRMBAf8EBTADAQH/
+MAoGCCqGSM49BAMCA0cAMEQCICQMdu+4fW5ljT8zejdahmowtwcFcwUDd77CNPpk
+oe41AiBrEUW4g5K1jrDYmVXWcE9PcVVzQaXnJ3qnyyqnYdVdEQ==
+-----END CERTIFICATE-----
+"""
+
+
+def test_not_after_from_der_without_cryptography(monkeypatch):
+    monkeypatch.setattr(checks, "x509", None)
+    der = ssl.PEM_cert_to_DER_cert(TEST_CERT_PEM)
+    assert checks._not_after_from_der(der) == datetime(2036, 10, 12, 9, 34, 39, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "platform, out, expected",
+    [
+        (
+            "linux",
+            "3 packets transmitted, 3 received, 0% packet loss, time 2003ms\n"
+            "rtt min/avg/max/mdev = 10.1/12.5/15.0/2.0 ms\n",
+            (3, 3, 12.5),
+        ),
+        (
+            "darwin",
+            "3 packets transmitted, 2 packets received, 33.3% packet loss\n"
+            "round-trip min/avg/max/stddev = 9.8/11.2/12.6/1.4 ms\n",
+            (3, 2, 11.2),
+        ),
+        ("linux", "3 packets transmitted, 0 received, 100% packet loss, time 2040ms\n", (3, 0, None)),
+        (
+            "win32",
+            "    Packets: Sent = 3, Received = 3, Lost = 0 (0% loss),\n"
+            "    Minimum = 10ms, Maximum = 14ms, Average = 12ms\n",
+            (3, 3, 12.0),
+        ),
+        ("linux", "ping: unknown host\n", (3, 0, None)),
+    ],
+)
+def test_parse_ping(monkeypatch, platform, out, expected):
+    monkeypatch.setattr(sys, "platform", platform)
+    assert _parse_ping(out, 3) == expected
+
+
+@pytest.mark.asyncio
+async def test_dns_lookup_serves_stale_entry_when_resolver_is_slow(monkeypatch):
+    loop = asyncio.get_running_loop()
+
+    async def slow_getaddrinfo(host, port, **kwargs):
+        await asyncio.sleep(1)
+        return []
+
+    stale_infos = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("192.0.2.7", 0))]
+    monkeypatch.setattr(loop, "getaddrinfo", slow_getaddrinfo)
+    monkeypatch.setattr(checks, "_dns_cache", {("stale.test", 0, socket.IPPROTO_TCP): (time.monotonic() - 1, stale_infos)})
+
+    r = await dns_lookup("stale.test", stale_deadline_s=0.05)
+    assert r.ok and r.stale
+    assert r.ips == ["192.0.2.7"]
+    refresh = checks._inflight.get(("stale.test", 0, socket.IPPROTO_TCP))
+    assert refresh is not None and not refresh.done()
+    refresh.cancel()
+
+
+DUAL_STACK_INFOS = [
+    (socket.AF_INET6, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("::1", 0, 0, 0)),
+    (socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("127.0.0.1", 0)),
+]
+
+
+def test_connect_any_falls_back_to_next_address():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+        with _connect_any(DUAL_STACK_INFOS, port, timeout_s=1.0) as sock:
+            assert sock.getpeername() == ("127.0.0.1", port)
+
+
+@pytest.mark.asyncio
+async def test_tcp_connect_falls_back_to_next_address(monkeypatch):
+    loop = asyncio.get_running_loop()
+
+    async def fake_getaddrinfo(host, port, **kwargs):
+        return DUAL_STACK_INFOS
+
+    monkeypatch.setattr(loop, "getaddrinfo", fake_getaddrinfo)
+    monkeypatch.setattr(checks, "_dns_cache", {})
+
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        r = await tcp_connect("dual.test", server.getsockname()[1], timeout_s=1.0)
+    assert r.ok, r.error
+
+
+@pytest.mark.asyncio
+async def test_tcp_connect_ip_literal_skips_resolver(monkeypatch):
+    loop = asyncio.get_running_loop()
+
+    async def fail_getaddrinfo(host, port, **kwargs):
+        raise AssertionError("resolver called for an IP literal")
+
+    monkeypatch.setattr(loop, "getaddrinfo", fail_getaddrinfo)
+    monkeypatch.setattr(checks, "_dns_cache", {})
+
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        r = await tcp_connect("127.0.0.1", server.getsockname()[1], timeout_s=1.0)
+    assert r.ok, r.error
+    assert checks._dns_cache == {}
+
+
+STALE_INFOS = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("192.0.2.7", 0))]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("errno, serves_stale", [(socket.EAI_AGAIN, True), (socket.EAI_NONAME, False)])
+async def test_dns_lookup_serves_stale_only_on_transient_failure(monkeypatch, errno, serves_stale):
+    loop = asyncio.get_running_loop()
+
+    async def failing_getaddrinfo(host, port, **kwargs):
+        raise socket.gaierror(errno, "lookup failed")
+
+    monkeypatch.setattr(loop, "getaddrinfo", failing_getaddrinfo)
+    monkeypatch.setattr(checks, "_dns_cache", {("stale.test", 0, socket.IPPROTO_TCP): (time.monotonic() - 1, STALE_INFOS)})
+
+    r = await dns_lookup("stale.test")
+    assert r.ok is serves_stale
+    assert r.stale is serves_stale
+
+
+@pytest.mark.asyncio
+async def test_dns_lookup_drops_entries_past_max_stale(monkeypatch):
+    loop = asyncio.get_running_loop()
+
+    async def slow_getaddrinfo(host, port, **kwargs):
+        await asyncio.sleep(1)
+        return []
+
+    expired = time.monotonic() - checks.DNS_MAX_STALE_S - 1
+    monkeypatch.setattr(loop, "getaddrinfo", slow_getaddrinfo)
+    monkeypatch.setattr(checks, "_dns_cache", {("stale.test", 0, socket.IPPROTO_TCP): (expired, STALE_INFOS)})
+
+    r = await dns_lookup("stale.test", timeout_s=0.1, stale_deadline_s=0.05)
+    assert not r.ok and not r.stale
+    assert checks._dns_cache == {}
+    refresh = checks._inflight.get(("stale.test", 0, socket.IPPROTO_TCP))
+    if refresh is not None:
+        refresh.cancel()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "age_s, force_refresh, fetched",
+    [(0, False, False), (30 * 86400 / 10 + 1, False, True), (0, True, True)],
+)
+async def test_tls_expiry_cache(monkeypatch, age_s, force_refresh, fetched):
+    now = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    not_after = now + timedelta(days=30)
+    calls = []
+
+    async def fake_resolve_addrs(host, *args, **kwargs):
+        calls.append(host)
+        raise OSError("handshake attempted")
+
+    monkeypatch.setattr(checks, "resolve_addrs", fake_resolve_addrs)
+    monkeypatch.setattr(checks, "_tls_cache", {("cached.test", 443): (not_after, time.monotonic() - age_s)})
+
+    r = await tls_expiry("cached.test", now_utc=now, force_refresh=force_refresh)
+    assert calls == (["cached.test"] if fetched else [])
+    if fetched:
+        assert not r.ok and r.error == "handshake attempted"
+    else:
+        assert r.ok and r.days_left == 30
+        assert r.not_after == not_after.isoformat()
+
+
+@pytest_asyncio.fixture
+async def http_server():
+    peers = set()
+
+    async def big(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        return web.Response(body=b"x" * 200_000)
+
+    app = web.Application()
+    app.router.add_get("/big", big)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}", peers
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_http_check_reports_status(http_server):
+    base, _ = http_server
+    async with aiohttp.ClientSession() as session:
+        ok = await http_check(session, f"{base}/big")
+        missing = await http_check(session, f"{base}/missing")
+    assert ok.ok and ok.status == 200 and ok.error is None
+    assert not missing.ok and missing.status == 404
+    assert missing.error == "HTTP Error 404: Not Found"
+
+
+@pytest.mark.asyncio
+async def test_http_check_reuses_pooled_connection(http_server):
+    base, peers = http_server
+    async with aiohttp.ClientSession() as session:
+        for _ in range(3):
+            r = await http_check(session, f"{base}/big")
+            assert r.ok
+    assert len(peers) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="uses the POSIX sleep binary")
+async def test_ping_kills_process_on_timeout(monkeypatch):
+    monkeypatch.setattr(checks, "_ping_cmd", lambda host, count, timeout_s: ["sleep", "30"])
+    r = await ping("192.0.2.1", count=1, timeout_s=0)
+    assert not r.ok
+    assert r.error == "ping timed out"
+    assert r.ms < 5000
+
+
+@pytest.mark.asyncio
+async def test_ping_missing_binary(monkeypatch):
+    monkeypatch.setattr(checks, "_ping_cmd", lambda host, count, timeout_s: ["netcheck-missing-ping-binary"])
+    r = await ping("192.0.2.1", count=2)
+    assert not r.ok
+    assert r.received == 0 and r.transmitted == 2
+    assert r.error
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+
+import pytest
+
+from netcheck import cli
+from netcheck.cli import build_parser, parse_tcp_list, parse_url_list, run_checks
+
+
+def test_parse_tcp_list():
+    assert parse_tcp_list("github.com:443, 1.1.1.1:53 ,,") == [("github.com", 443), ("1.1.1.1", 53)]
+
+
+@pytest.mark.parametrize("value", ["github.com", "github.com:https", "a:1,b"])
+def test_parse_tcp_list_rejects_invalid_targets(value):
+    with pytest.raises(ValueError):
+        parse_tcp_list(value)
+
+
+def test_parse_url_list():
+    assert parse_url_list(" https://example.com ,https://github.com,, ") == ["https://example.com", "https://github.com"]
+
+
+@pytest.mark.asyncio
+async def test_run_checks_respects_concurrency(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_tcp_connect(host, port):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return (host, port)
+
+    monkeypatch.setattr(cli, "tcp_connect", fake_tcp_connect)
+    targets = ",".join(f"h{i}:{i + 1}" for i in range(10))
+    args = build_parser().parse_args(["--tcp", targets, "--concurrency", "3"])
+
+    results = await run_checks(args)
+    assert len(results["tcp"]) == 10
+    assert peak == 3
+
+
+@pytest.mark.parametrize("value", ["0", "-2"])
+def test_concurrency_rejects_values_below_one(value):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["--concurrency", value])
+
+
+def test_run_uses_uvloop_without_touching_the_policy():
+    uvloop = pytest.importorskip("uvloop")
+
+    async def loop_type():
+        return {"loop": type(asyncio.get_running_loop())}
+
+    policy = asyncio.get_event_loop_policy()
+    assert cli._run(loop_type()) == {"loop": uvloop.Loop}
+    if sys.version_info >= (3, 11):
+        assert asyncio.get_event_loop_policy() is policy